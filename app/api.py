@@ -1,12 +1,17 @@
+import asyncio
 import logging
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List 
+from threading import Lock
+from typing import List, Tuple
 from uuid import uuid4
 
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile, status
+from fastapi import BackgroundTasks, Depends, FastAPI, File, HTTPException, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, joinedload
 
 from app.agent.qa_agent import answer_query
 from app.models.classifier import LABELS, fit_and_save, load_model, predict
@@ -24,14 +29,17 @@ APP_ROOT = Path(__file__).resolve().parent
 STORAGE_DIR  = APP_ROOT / "storage"
 INDEX_DIR = STORAGE_DIR / "index"
 UPLOADS_DIR = STORAGE_DIR / "uploads"
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "64"))
 
 for path in (STORAGE_DIR, INDEX_DIR, UPLOADS_DIR):
     path.mkdir(parents=True, exist_ok=True)
     
 knowledge = KnowledgeStore(index_dir=INDEX_DIR, uploads_dir=UPLOADS_DIR)
+_classifier_fit_lock = Lock()
 
 
-app = FastAPI(title="Sumbawa AI Legal Dashboard")
+app = FastAPI(title="Sumbawa AI Legal Dashboard", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,9 +56,15 @@ app.add_middleware(
 
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE))
     Base.metadata.create_all(bind=engine)
     auth.bootstrap_admin()
+    try:
+        await asyncio.to_thread(knowledge.warm_up)
+    except Exception as exc: # pragma: no cover - log only
+        # Best-effort: the index is loaded lazily on the first request instead.
+        logger.warning("Knowledge warm-up failed: %s", exc)
     logger.info("Backend started.")
     
     
@@ -87,14 +101,14 @@ def register_user(payload: schemas.UserRegister, db: Session = Depends(get_db)):
 
 
 @app.get("/auth/me", response_model=schemas.UserBase)
-def read_me(current_user: models.User = Depends(auth.get_current_user)):
+def read_me(current_user: auth.UserRecord = Depends(auth.get_current_user)):
     return current_user
 
 @app.post("/admin/users", response_model=schemas.UserBase)
 def create_user(
     payload: schemas.UserCreate,
     db: Session = Depends(get_db),
-    _: models.User = Depends(auth.require_admin),
+    _: auth.UserRecord = Depends(auth.require_admin),
 ):
     if payload.role not in {"admin", "user"}:
         raise HTTPException(status_code=400, detail="Invalid role")
@@ -117,61 +131,142 @@ def create_user(
     return user 
 
 
+def _copy_upload(source, destination: Path) -> None:
+    with destination.open("wb") as buffer:
+        # Once the spooled upload has rolled over to disk, let the kernel copy it
+        # fd-to-fd instead of bouncing every block through Python.
+        if getattr(source, "_rolled", False) and hasattr(os, "sendfile"):
+            source.flush()
+            src_fd = source.fileno()
+            size = os.fstat(src_fd).st_size
+            offset = 0
+            try:
+                while offset < size:
+                    sent = os.sendfile(buffer.fileno(), src_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+            except OSError as exc:
+                logger.debug("sendfile unavailable, falling back to buffered copy: %s", exc)
+                buffer.seek(0)
+                buffer.truncate()
+        source.seek(0)
+        shutil.copyfileobj(source, buffer, length=COPY_BUFFER_SIZE)
+
+
+def _filename_char(codepoint: int) -> str:
+    ch = chr(codepoint)
+    return ch if ch.isalnum() or ch in "._-" else "_"
+
+
+class _FilenameTable(dict):
+    # str.translate table: Latin-1 is precomputed; other code points are
+    # classified on the fly (keeping isalnum() semantics) but not stored, so
+    # uploader-chosen names cannot grow the table.
+    def __missing__(self, codepoint: int) -> str:
+        return _filename_char(codepoint)
+
+
+_FILENAME_TABLE = _FilenameTable({codepoint: _filename_char(codepoint) for codepoint in range(256)})
+
+
 def _sanitize_filename(name: str) -> str:
-    clean = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in name)
+    clean = name.translate(_FILENAME_TABLE)
     clean = clean.strip("._") or "upload"
     return clean
 
 
+def _persist_and_index(file: UploadFile) -> Tuple[str, str, int]:
+    safe_name = _sanitize_filename(file.filename or "document")
+    stored_name = f"{uuid4().hex}_{safe_name}"
+    destination = UPLOADS_DIR / stored_name
+    
+    original_name = file.filename or stored_name
+    try:
+        _copy_upload(file.file, destination)
+        file.file.close()
+        chunks_indexed = knowledge.add_file(file_path=destination, doc_id=original_name)
+    except Exception:
+        # add_file only touches the index after parsing succeeds, so nothing
+        # else refers to the stored copy; don't leave it orphaned on disk.
+        logger.exception("Failed to process upload %s (stored as %s)", original_name, stored_name)
+        destination.unlink(missing_ok=True)
+        raise
+    return original_name, stored_name, chunks_indexed
+
+
 @app.post("/admin/upload", response_model=List[schemas.DocumentUploadResult])
 async def upload_documents(
     files: List[UploadFile] =  File(...),
-    current_user: models.User =  Depends(auth.require_admin),
+    current_user: auth.UserRecord =  Depends(auth.require_admin),
     db: Session = Depends(get_db),
 ):
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
     
-    results: List[schemas.DocumentUploadResult] = []
-    for file in files:
-        safe_name = _sanitize_filename(file.filename or "document")
-        stored_name = f"{uuid4().hex}_{safe_name}"
-        destination = UPLOADS_DIR / stored_name
-        
-        with destination.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        file.file.close()
-        
-        chunks_indexed = knowledge.add_file(file_path=destination, doc_id=file.filename or stored_name)
-        document = models.Document(
-            original_filename=file.filename or stored_name,
+    # Copying and parsing are blocking, so run them on the executor and let
+    # the files of one request be indexed in parallel.
+    outcomes = await asyncio.gather(
+        *[asyncio.to_thread(_persist_and_index, file) for file in files],
+        return_exceptions=True,
+    )
+    persisted = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+    failures = [
+        (file.filename or "document", outcome)
+        for file, outcome in zip(files, outcomes)
+        if isinstance(outcome, BaseException)
+    ]
+    
+    documents = [
+        models.Document(
+            original_filename=original_name,
             stored_filename=stored_name,
             uploaded_by=current_user.id,
         )
-        db.add(document)
-        db.commit()
-        db.refresh(document)
-        
-        results.append(
-            schemas.DocumentUploadResult(
-                id=document.id,
-                original_filename=document.original_filename,
-                stored_filename=document.stored_filename,
-                uploaded_at=document.uploaded_at,
-                uploaded_by=document.uploaded_by,
-                uploader_username=current_user.username,
-                chunks_indexed=chunks_indexed,
-            )
+        for original_name, stored_name, _ in persisted
+    ]
+    db.add_all(documents)
+    # Flush assigns ids and defaults; build the payload before commit expires them.
+    db.flush()
+    
+    results: List[schemas.DocumentUploadResult] = [
+        schemas.DocumentUploadResult(
+            id=document.id,
+            original_filename=document.original_filename,
+            stored_filename=document.stored_filename,
+            uploaded_at=document.uploaded_at,
+            uploaded_by=document.uploaded_by,
+            uploader_username=current_user.username,
+            chunks_indexed=chunks_indexed,
+        )
+        for document, (_, _, chunks_indexed) in zip(documents, persisted)
+    ]
+    db.commit()
+    
+    if failures:
+        # Successful files are already recorded above; report the rest.
+        failed = "; ".join(f"{name}: {exc}" for name, exc in failures)
+        uploaded = ", ".join(result.original_filename for result in results) or "-"
+        all_invalid = all(isinstance(exc, ValueError) for _, exc in failures)
+        raise HTTPException(
+            status_code=400 if all_invalid else 500,
+            detail=f"Failed to process: {failed}. Uploaded: {uploaded}",
         )
     return results 
 
 
 @app.get("/admin/documents", response_model=List[schemas.DocumentInfo])
 def list_documents(
-    _: models.User = Depends(auth.require_admin),
+    _: auth.UserRecord = Depends(auth.require_admin),
     db: Session = Depends(get_db),
 ):
-    documents = db.query(models.Document).order_by(models.Document.uploaded_at.desc()).all()
+    documents = (
+        db.query(models.Document)
+        .options(joinedload(models.Document.uploader))
+        .order_by(models.Document.uploaded_at.desc())
+        .all()
+    )
     payload: List[schemas.DocumentInfo] = []
     for doc in documents:
         payload.append(
@@ -187,10 +282,22 @@ def list_documents(
     return payload
 
 
+def _bootstrap_classifier(texts: List[str]) -> None:
+    if not _classifier_fit_lock.acquire(blocking=False):
+        return
+    try:
+        if load_model() is None:
+            labels = [LABELS[i % len(LABELS)] for i in range(len(texts))]
+            fit_and_save(texts, labels)
+    finally:
+        _classifier_fit_lock.release()
+
+
 @app.post("/chat/ask", response_model=schemas.ChatResponse)
 def ask_ai(
     payload: schemas.ChatRequest,
-    _: models.User = Depends(auth.get_current_user),
+    background_tasks: BackgroundTasks,
+    _: auth.UserRecord = Depends(auth.get_current_user),
 ):
     if knowledge.is_empty():
         raise HTTPException(status_code=400, detail="Knowledge base is empty. Admin needs to upload documents.")
@@ -201,21 +308,19 @@ def ask_ai(
     
     qa_result = answer_query(payload.question, hits, use_llm=payload.use_llm)
     
+    texts = [hit["text"] for hit in hits]
     classification = None 
     model = load_model()
     if model is None:
-        texts = [hit["text"] for hit in hits]
-        labels = [LABELS[i % len(LABELS)] for i in range(len(texts))]
-        if texts:
-            fit_and_save(texts, labels)
-            model = load_model()
-    
-    if model:
-        pred = predict(" ".join(hit["text"] for hit in hits[:3]), model)
+        # Fitting takes seconds; train after the response and classify from the next request on.
+        background_tasks.add_task(_bootstrap_classifier, texts)
+    else:
+        pred = predict(" ".join(texts[:3]), model)
         classification = schemas.ClassificationInfo(label=pred.label, score=pred.proba)
     
+    # Hits come from our own index, so skip per-field validation.
     context_payload = [
-        schemas.ContextHit(
+        schemas.ContextHit.model_construct(
             doc_id=hit.get("doc_id"),
             source=hit.get("source"),
             text=hit.get("text", ""),
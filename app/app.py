@@ -1,5 +1,4 @@
 import os 
-from datetime import datetime
 from typing import Dict, List, Optional
 
 import requests
@@ -7,6 +6,7 @@ import streamlit as st
 from dotenv import load_dotenv
 import pandas as pd 
 import altair as alt
+from requests_toolbelt import MultipartEncoder
 
 from utils.report import  make_pdf_report
 
@@ -29,6 +29,9 @@ def init_state():
     }
     for key, value in defaults.items():
         st.session_state.setdefault(key, value)
+    # One pooled session per browser session keeps the backend connection alive.
+    if "http" not in st.session_state:
+        st.session_state.http = requests.Session()
         
         
 
@@ -79,7 +82,7 @@ def handle_response(response: requests.Response) -> Optional[Dict]:
 
 def api_get(path: str, timeout: int = 30) -> Optional[Dict]:
     try:
-        response = requests.get(f"{API_URL}{path}", headers=auth_headers(), timeout=timeout)
+        response = st.session_state.http.get(f"{API_URL}{path}", headers=auth_headers(), timeout=timeout)
     except requests.RequestException as exc:
         st.error(f"Gagal menghubungi backend: {exc}")
         return None 
@@ -88,7 +91,7 @@ def api_get(path: str, timeout: int = 30) -> Optional[Dict]:
 
 def api_post_json(path: str, payload: Dict, timeout: int =120) -> Optional[Dict]:
     try:
-        response = requests.post(
+        response = st.session_state.http.post(
             f"{API_URL}{path}",
             headers=auth_headers({"Content-Type": "application/json"}),
             json=payload,
@@ -102,11 +105,13 @@ def api_post_json(path: str, payload: Dict, timeout: int =120) -> Optional[Dict]
 
 
 def api_post_files(path: str, files, timeout: int = 300) -> Optional[Dict]:
+    # Encode parts incrementally instead of joining the whole multipart body into one bytes object.
+    encoder = MultipartEncoder(fields=files)
     try:
-        response = requests.post(
+        response = st.session_state.http.post(
             f"{API_URL}{path}",
-            headers=auth_headers(),
-            files=files,
+            headers=auth_headers({"Content-Type": encoder.content_type}),
+            data=encoder,
             timeout=timeout,
         )
     except requests.RequestException as exc:
@@ -159,13 +164,6 @@ def login_form():
                     st.success("Registrasi berhasil. Silahkan login.")
                     
 
-def format_timestamp(value: str) -> str:
-    try:
-        return datetime.fromisoformat(value.replace("Z", "+00:00")).strftime("%d %b %Y %H:%M")
-    except ValueError:
-        return value
-    
-
 def render_admin_dashboard():
     st.subheader("Kelola Knowledge Base")
     uploaded_files = st.file_uploader(
@@ -179,7 +177,7 @@ def render_admin_dashboard():
             st.warning("Pilih minimal satu dokumen.")
         else:
             files_payload = [
-                ("files", (file.name, file.getvalue(), file.type or "application/octet-stream"))
+                ("files", (file.name, file, file.type or "application/octet-stream"))
                 for file in uploaded_files
             ]
             result = api_post_files("/admin/upload", files_payload)
@@ -205,15 +203,14 @@ def render_admin_dashboard():
         st.bar_chart(daily.set_index("uploaded_at"))
         
         
-        rows = [
+        rows = pd.DataFrame(
             {
-                "Nama Dokumen": doc["original_filename"],
-                "Uploader": doc.get("uploader_username") or "-",
-                "Tanggal": format_timestamp(doc["uploaded_at"]),
-                "Vector Chunks": doc.get("chunks_indexed", "-"),
+                "Nama Dokumen": df["original_filename"],
+                "Uploader": df["uploader_username"].fillna("-"),
+                "Tanggal": df["uploaded_at"].dt.strftime("%d %b %Y %H:%M"),
+                "Vector Chunks": df["chunks_indexed"] if "chunks_indexed" in df else "-",
             }
-            for doc in documents
-        ]
+        )
         st.dataframe(rows, use_container_width=True, hide_index=True)
     else:
         st.info("Belum ada dokumen di knowledge base.")
@@ -3,7 +3,8 @@ from typing import Generator
 from pathlib import Path 
 from typing import Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
 from dotenv import load_dotenv
 
@@ -16,10 +17,31 @@ STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 default_db_path = STORAGE_DIR / "app.db"
 DATABASE_URL = os.getenv("DATABASE_URL") or f"sqlite:///{default_db_path.as_posix()}"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
-)
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_SQLITE_MEMORY = IS_SQLITE and make_url(DATABASE_URL).database in (None, "", ":memory:")
+
+engine_options = {
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+    "connect_args": {"check_same_thread": False, "timeout": 30} if IS_SQLITE else {},
+}
+if not IS_SQLITE_MEMORY:
+    # In-memory SQLite uses a singleton pool that has no overflow settings.
+    engine_options.update(pool_size=10, max_overflow=20)
+if DATABASE_URL.startswith(("postgresql://", "postgresql+psycopg2://")):
+    engine_options.update(executemany_mode="values_plus_batch", insertmanyvalues_page_size=1000)
+
+engine = create_engine(DATABASE_URL, **engine_options)
+
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -1,61 +1,176 @@
 import logging
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from threading import RLock
-from typing import List, Dict
+from threading import Condition, Lock
+from typing import Iterator, List, Dict, Tuple
 
-from app.nlp.embedding import VectorIndex
-from app.nlp.ingest import build_chunks
+import faiss
+import numpy as np
+
+from app.nlp.embedding import MISSING_INT, VectorIndex, object_column
+from app.nlp.ingest import Chunk, build_chunks
 
 logger = logging.getLogger(__name__)
 
 
+def _chunk_columns(chunks: List[Chunk]) -> Dict[str, np.ndarray]:
+    n = len(chunks)
+    columns = {
+        "doc_id": object_column(chunk.doc_id for chunk in chunks),
+        "source": object_column(chunk.meta.get("source") for chunk in chunks),
+        "chunk_index": np.arange(1, n + 1, dtype=np.int32),
+    }
+    for name in ("page", "section", "section_chunk"):
+        columns[name] = np.fromiter(
+            (chunk.meta.get(name, MISSING_INT) for chunk in chunks), dtype=np.int32, count=n
+        )
+    return columns
+
+
+class ReadWriteLock:
+    """Many concurrent readers or a single writer; a waiting writer blocks new readers."""
+
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+class QueryCache:
+    """LRU of search results keyed by the normalized question text.
+
+    Only exact repeats hit: legal questions that differ by one article number
+    ("Pasal 5" vs "Pasal 6") embed almost identically but need different hits.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.entries: OrderedDict[str, Tuple[int, List[Dict]]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, query: str, k: int) -> List[Dict] | None:
+        key = _normalize_query(query)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < k:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1][:k]
+
+    def put(self, query: str, k: int, hits: List[Dict]):
+        key = _normalize_query(query)
+        with self._lock:
+            self.entries[key] = (k, hits)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
 class KnowledgeStore:
     def __init__(self, index_dir: Path, uploads_dir: Path, dim: int = 384):
         self.index_dir = Path(index_dir)
         self.uploads_dir = Path(uploads_dir)
         self.dim = dim 
-        self._lock = RLock()
+        self._lock = ReadWriteLock()
+        self._init_lock = Lock()
         self._index: VectorIndex | None = None 
+        self._query_cache = QueryCache()
         
         self.index_dir.mkdir(parents=True, exist_ok=True)
         self.uploads_dir.mkdir(parents=True, exist_ok=True)
         
     def _ensure_index(self) -> VectorIndex:
         if self._index is None:
-            idx = VectorIndex(dim=self.dim, storage_dir=str(self.index_dir))
-            try:
-                idx.load()
-            except Exception as exc: # pragma: no cover - log only
-                logger.warning("Failed to load index: %s", exc)
-            self._index = idx
+            # Readers may race here, so the lazy load gets its own mutex.
+            with self._init_lock:
+                if self._index is None:
+                    idx = VectorIndex(dim=self.dim, storage_dir=str(self.index_dir))
+                    try:
+                        idx.load()
+                    except Exception as exc: # pragma: no cover - log only
+                        logger.warning("Failed to load index: %s", exc)
+                    self._index = idx
         return self._index
     
     
+    def warm_up(self) -> None:
+        """Load the index and embedding model before the first query arrives."""
+        faiss.omp_set_num_threads(os.cpu_count() or 1)
+        with self._lock.read():
+            index = self._ensure_index()
+            index.encode_texts(["warm up"])
+    
+    
     def add_file(self, file_path: Path, doc_id: str) -> int:
         chunks = build_chunks(str(file_path), doc_id=doc_id)
         if not chunks:
             return 0
         
-        texts: List[str] = []
-        metas: List[Dict] = []
-        for chunk in chunks:
-            meta = dict(chunk.meta)
-            meta["doc_id"] = chunk.doc_id
-            meta["chunk_index"] = len(metas) + 1
-            texts.append(chunk.text)
-            metas.append(meta)
+        texts: List[str] = [chunk.text for chunk in chunks]
+        columns = _chunk_columns(chunks)
         
-        with self._lock:
-            index = self._ensure_index()
-            index.add_texts(texts, metas)
+        # Embedding is the slow part and touches no shared state; only the
+        # index mutation and save need exclusive access.
+        index = self._ensure_index()
+        embs = index.encode_texts(texts)
+        with self._lock.write():
+            index.add_embeddings(embs, texts, columns)
             index.save()
+            self._query_cache.clear()
         
         return len(texts)
     
     
     def search(self, query: str, k: int) -> List[Dict]:
-        with self._lock:
+        with self._lock.read():
             index = self._ensure_index()
+            if index.is_empty():
+                return []
+            # Checked before embedding, so a repeated question skips the encoder too.
+            cached = self._query_cache.get(query, k)
+            if cached is not None:
+                return [dict(hit) for hit in cached]
+            
             raw_hits = index.search(query, k=k)
             hits: List[Dict] = []
             for score, meta in raw_hits:
@@ -63,11 +178,12 @@ class KnowledgeStore:
                 record.setdefault("text", meta.get("text", ""))
                 record["score"] = score 
                 hits.append(record)
+            self._query_cache.put(query, k, [dict(hit) for hit in hits])
             return hits
         
     
     def is_empty(self) -> bool:
-        with self._lock:
+        with self._lock.read():
             index = self._ensure_index()
             return index.is_empty()
         
@@ -4,6 +4,7 @@ import os
 import pickle
 import statistics
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Sequence
 
 from sklearn.ensemble import RandomForestClassifier
@@ -41,15 +42,24 @@ def fit_and_save(train_texts: Sequence[str], train_labels: Sequence[str], path:
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "wb") as handle:
         pickle.dump(model, handle)
+    _load_model_cached.cache_clear()
 
 
-def load_model(path: str = MODEL_PATH) -> Pipeline | None:
-    if not os.path.exists(path):
-        return None
+@lru_cache(maxsize=1)
+def _load_model_cached(path: str, mtime: float) -> Pipeline:
     with open(path, "rb") as handle:
         return pickle.load(handle)
 
 
+def load_model(path: str = MODEL_PATH) -> Pipeline | None:
+    # Keyed by mtime so a model rewritten on disk is picked up without a restart.
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    return _load_model_cached(str(path), mtime)
+
+
 def predict(text: str, model: Pipeline) -> PredictResult:
     proba = model.predict_proba([text])[0]
     idx = int(proba.argmax())
@@ -3,13 +3,53 @@ from __future__ import annotations
 import os
 import pickle
 from functools import lru_cache
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
 import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ENCODE_BATCH_SIZE = 64
+
+# Chunk metadata is stored column-wise (one array per field) rather than as a
+# dict per chunk. Integer fields use MISSING_INT where a chunk has no value.
+META_STR_FIELDS = ("doc_id", "source")
+META_INT_FIELDS = ("chunk_index", "page", "section", "section_chunk")
+MISSING_INT = -1
+
+
+def object_column(values: Iterable) -> np.ndarray:
+    values = list(values)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def _empty_columns(n: int = 0) -> Dict[str, np.ndarray]:
+    columns = {name: np.full(n, None, dtype=object) for name in META_STR_FIELDS}
+    columns.update({name: np.full(n, MISSING_INT, dtype=np.int32) for name in META_INT_FIELDS})
+    return columns
+
+
+def _columns_from_records(records: List[dict]) -> Dict[str, np.ndarray]:
+    # Converts the legacy list-of-dicts meta.pkl layout.
+    n = len(records)
+    columns = {name: object_column(r.get(name) for r in records) for name in META_STR_FIELDS}
+    for name in META_INT_FIELDS:
+        columns[name] = np.fromiter(
+            (r.get(name) or MISSING_INT for r in records), dtype=np.int32, count=n
+        )
+    return columns
+
+
+def _write_atomic(path: str, data) -> None:
+    # One large write into a sibling temp file, then an atomic rename, so readers
+    # never observe a half-written index and the kernel sees a single sequential write.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(memoryview(data))
+    os.replace(tmp_path, path)
 
 
 @lru_cache(maxsize=1)
@@ -24,7 +64,8 @@ class VectorIndex:
         self.meta_path = os.path.join(storage_dir, "meta.pkl")
         self.model = _load_sentence_transformer(MODEL_NAME)
         self.index: faiss.Index | None = None
-        self.meta: List[dict] = []
+        self.texts: List[str] = []
+        self.columns: Dict[str, np.ndarray] = _empty_columns()
         self._dim = dim
 
     def _ensure(self, dim: int):
@@ -36,18 +77,38 @@ class VectorIndex:
     def is_empty(self) -> bool:
         return self.index is None or getattr(self.index, "ntotal", 0) == 0
 
-    def add_texts(self, texts: List[str], meta_list: List[dict]):
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        embs = self.model.encode(
+            texts,
+            batch_size=ENCODE_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        return embs.astype(np.float32)
+
+    def add_embeddings(self, embs: np.ndarray, texts: List[str], columns: Dict[str, np.ndarray]):
         if not texts:
             return
-        embs = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
         self._ensure(embs.shape[1])
-        self.index.add(embs.astype(np.float32))
-        start = len(self.meta)
-        for offset, (text, meta) in enumerate(zip(texts, meta_list)):
-            stored = dict(meta)
-            stored.setdefault("text", text)
-            stored.setdefault("vector_id", start + offset)
-            self.meta.append(stored)
+        self.index.add(embs)
+        added = _empty_columns(len(texts))
+        added.update(columns)
+        self.columns = {
+            name: np.concatenate([self.columns[name], added[name]]) for name in self.columns
+        }
+        self.texts.extend(texts)
+
+    def _record(self, idx: int) -> dict:
+        record = {"text": self.texts[idx], "vector_id": idx}
+        for name in META_STR_FIELDS:
+            value = self.columns[name][idx]
+            if value is not None:
+                record[name] = value
+        for name in META_INT_FIELDS:
+            value = int(self.columns[name][idx])
+            if value != MISSING_INT:
+                record[name] = value
+        return record
 
     def search(self, query: str, k: int = 5) -> List[Tuple[float, dict]]:
         if self.is_empty():
@@ -56,27 +117,36 @@ class VectorIndex:
         D, I = self.index.search(q, k)
         results: List[Tuple[float, dict]] = []
         for score, idx in zip(D[0], I[0]):
-            if idx == -1 or idx >= len(self.meta):
+            if idx == -1 or idx >= len(self.texts):
                 continue
-            results.append((float(score), self.meta[idx]))
+            results.append((float(score), self._record(int(idx))))
         return results
 
     def save(self):
         os.makedirs(self.storage_dir, exist_ok=True)
         if self.index is not None:
-            faiss.write_index(self.index, self.index_path)
-        with open(self.meta_path, "wb") as f:
-            pickle.dump(self.meta, f)
+            _write_atomic(self.index_path, faiss.serialize_index(self.index))
+        meta = {"texts": self.texts, "columns": self.columns}
+        _write_atomic(self.meta_path, pickle.dumps(meta, protocol=pickle.HIGHEST_PROTOCOL))
 
     def load(self):
         if os.path.exists(self.index_path):
             self.index = faiss.read_index(self.index_path)
         else:
             self.index = None
+        meta = None
         if os.path.exists(self.meta_path):
             with open(self.meta_path, "rb") as f:
-                self.meta = pickle.load(f) or []
+                meta = pickle.load(f)
+        if isinstance(meta, dict):
+            self.texts = list(meta.get("texts", []))
+            self.columns = _empty_columns(len(self.texts))
+            self.columns.update(meta.get("columns", {}))
+        elif meta:
+            self.texts = [record.get("text", "") for record in meta]
+            self.columns = _columns_from_records(meta)
         else:
-            self.meta = []
+            self.texts = []
+            self.columns = _empty_columns()
         if self.index is not None and getattr(self.index, "d", self._dim) != self._dim:
-            raise ValueError("Dimensi index tidak sesuai dengan model embedding.")
\ No newline at end of file
+            raise ValueError("Dimensi index tidak sesuai dengan model embedding.")
@@ -37,20 +37,18 @@ def read_pdf(path: str) -> List[Tuple[int, str]]:
 
 def read_docx(path: str) -> List[Tuple[int, str]]:
     document = Document(path)
-    blocks: List[Tuple[int, str]] = []
+    blocks: List[str] = []
     buffer: List[str] = []
     for paragraph in document.paragraphs:
         text = _clean_text(paragraph.text)
         if text:
             buffer.append(text)
         elif buffer:
-            joined = " ".join(buffer)
-            blocks.append((len(blocks) + 1, joined))
+            blocks.append(" ".join(buffer))
             buffer = []
     if buffer:
-        joined = " ".join(buffer)
-        blocks.append((len(blocks) + 1, joined))
-    return blocks
+        blocks.append(" ".join(buffer))
+    return list(enumerate(blocks, start=1))
 
 
 def sentences(text: str) -> List[str]:
@@ -1,68 +1,210 @@
 from __future__ import annotations
 
-import datetime as dt
-from typing import Dict, List
+import atexit
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from html import escape
+from collections.abc import Iterator, Mapping, Sequence
+from typing import TYPE_CHECKING, Any, BinaryIO
 
 from io import BytesIO
-from markdown import markdown
-from xhtml2pdf import pisa
-
-def _format_location(hit: Dict) -> str:
-    parts = []
-    if hit.get("page"):
-        parts.append(f"hal. {hit['page']}")
-    if hit.get("section"):
-        parts.append(f"paragraf {hit['section']}")
-    if hit.get("section_chunk"):
-        parts.append(f"bagian {hit['section_chunk']}")
-    return ", ".join(parts)
-
-
-def make_markdown_report(query: str, answer: str, hits: List[Dict], rec: str = "") -> str:
-    ts = dt.datetime.now().strftime("%Y-%m-%d %H:%M")
-    lines = ["# Rekomendasi Kebijakan - Laporan", f"_Generated: {ts}_", ""]
-    lines += ["## Pertanyaan", query, ""]
-    lines += ["## Jawaban/Analisis", answer, ""]
-    lines += ["## Referensi Konteks"]
+
+if TYPE_CHECKING:
+    from markdown import Markdown
+
+# markdown and xhtml2pdf (which pulls in ReportLab, PIL and html5lib) are
+# imported on first PDF render so that markdown-only callers stay light.
+
+MARKDOWN_EXTENSIONS = ['tables', 'sane_lists']
+_local = threading.local()
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_ts_cache = (-1, "")
+
+# Only PDF standard-14 fonts: ReportLab ships their metrics and nothing is
+# embedded, so there is no per-document font work to cache. xhtml2pdf parses
+# this sheet on every document, so it stays minimal.
+_REPORT_CSS = (
+    "body{font-family:Helvetica;line-height:1.5;font-size:12pt}"
+    "h1,h2,h3{color:#1F4E79;margin-top:1.2em}"
+    "p{margin:0.4em 0}"
+    "blockquote{margin:0.6em 0;padding-left:0.6em;border-left:3px solid #ccc;font-style:italic}"
+    "table{width:100%;margin:0.8em 0}"
+    "th,td{border:1px solid #ccc;padding:6px;text-align:left}"
+    "code{font-family:Courier}"
+)
+_HTML_PREFIX = f"<html><head><meta charset='utf-8' /><style>{_REPORT_CSS}</style></head><body>"
+_HTML_SUFFIX = "</body></html>"
+
+# Anything that could be markdown (emphasis, code, headings, quotes, links,
+# tables, raw HTML/entities, lists, setext rules, indented code).
+_MARKDOWN_SYNTAX = re.compile(r"[*_`#>\[|<&\\]|^\s*(?:[-+]|\d+[.)])\s|^\s*(?:=+|-{3,})\s*$|^ {4}", re.M)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def _markdown_converter() -> Markdown:
+    # Markdown instances are not thread-safe, so keep one per thread and reset it per use.
+    converter = getattr(_local, "markdown", None)
+    if converter is None:
+        from markdown import Markdown
+
+        converter = _local.markdown = Markdown(extensions=MARKDOWN_EXTENSIONS, output_format='html5')
+    return converter.reset()
+
+
+def _now_str() -> str:
+    # Reports only show minutes, so format once per wall-clock minute.
+    global _ts_cache
+    minute = int(time.time() // 60)
+    if minute != _ts_cache[0]:
+        _ts_cache = (minute, time.strftime("%Y-%m-%d %H:%M"))
+    return _ts_cache[1]
+
+
+_LOCATION_LABELS = ("hal.", "paragraf", "bagian")
+
+
+@lru_cache(maxsize=256)
+def _format_location_cached(page, section, section_chunk) -> str:
+    # Retrieval often returns several chunks from the same page/section.
+    values = (page, section, section_chunk)
+    return ", ".join(f"{label} {value}" for label, value in zip(_LOCATION_LABELS, values) if value)
+
+
+def _format_location(hit: Mapping[str, Any]) -> str:
+    return _format_location_cached(hit.get("page"), hit.get("section"), hit.get("section_chunk"))
+
+
+_SNIPPET_TRANS = str.maketrans({"\n": " ", "\r": " "})
+
+
+def _snippet(hit: Mapping[str, Any]) -> str:
+    # Newlines would end the "> " blockquote early in the markdown export.
+    return (hit.get("text") or "")[:800].translate(_SNIPPET_TRANS)
+
+
+def _location_note(hit: Mapping[str, Any]) -> str:
+    location = _format_location(hit)
+    return f" ({location})" if location else ""
+
+
+def _emit_markdown(query: str, answer: str, hits: Sequence[Mapping[str, Any]], rec: str) -> Iterator[str]:
+    ts = _now_str()
+    yield "# Rekomendasi Kebijakan - Laporan"
+    yield f"_Generated: {ts}_"
+    yield ""
+    yield "## Pertanyaan"
+    yield query
+    yield ""
+    yield "## Jawaban/Analisis"
+    yield answer
+    yield ""
+    yield "## Referensi Konteks"
     for i, hit in enumerate(hits, 1):
         source = hit.get("source") or hit.get("doc_id") or "-"
-        score = hit.get("score", 0.0)
-        location = _format_location(hit)
-        location_note = f" ({location})" if location else ""
-        lines.append(f"{i}. **{source}**{location_note} - skor: {score:.3f}")
-        snippet = hit.get("text", "")[:800]
-        lines.append(f"   > {snippet}")
+        yield f"{i}. **{source}**{_location_note(hit)} - skor: {hit.get('score', 0.0):.3f}"
+        yield f"   > {_snippet(hit)}"
     if rec:
-        lines += ["", "## Rekomendasi Sistem", rec]
-    return "\n".join(lines)
+        yield ""
+        yield "## Rekomendasi Sistem"
+        yield rec
 
 
-def make_pdf_report(query: str, answer: str, hits: List[Dict], rec: str = "") -> bytes:
-    markdown_body = make_markdown_report(query, answer, hits, rec)
-    html = markdown(
-        markdown_body,
-        extensions=['extra', 'tables', 'sane_lists', 'toc'],
-        output_format='html5'
+def make_markdown_report(query: str, answer: str, hits: Sequence[Mapping[str, Any]], rec: str = "") -> str:
+    return "\n".join(_emit_markdown(query, answer, hits, rec))
+
+
+def _render_text(text: str) -> str:
+    # Plain prose is escaped straight into paragraphs; markdown only runs when
+    # the text could contain syntax.
+    if _MARKDOWN_SYNTAX.search(text):
+        return _markdown_converter().convert(text)
+    return "".join(
+        f"<p>{escape(paragraph, quote=False)}</p>"
+        for paragraph in _PARAGRAPH_BREAK.split(text.strip())
+        if paragraph
     )
-    template = (
-        "<html><head><meta charset='utf-8' />"
-        "<style>"
-        "body { font-family: 'Helvetica', sans-serif; line-height: 1.5; font-size: 12pt; }"
-        "h1, h2, h3 { color: #1F4E79; margin-top: 1.2em; }"
-        "p { margin: 0.4em 0; }"
-        "blockquote { margin: 0.6em 0; padding-left: 0.6em; border-left: 3px solid #ccc; font-style: italic; }"
-        "table { width: 100%; border-collapse: collapse; margin: 0.8em 0; }"
-        "th, td { border: 1px solid #ccc; padding: 6px; text-align: left; }"
-        "code { font-family: 'Courier New', monospace; }"
-        "</style>"
-        "</head><body>"
-        f"{html}"
-        "</body></html>"
+
+
+def _render_reference(hit: Mapping[str, Any]) -> str:
+    source = escape(str(hit.get("source") or hit.get("doc_id") or "-"), quote=False)
+    return (
+        f"<li><p><strong>{source}</strong>{_location_note(hit)}"
+        f" - skor: {hit.get('score', 0.0):.3f}</p>"
+        f"<blockquote>{escape(_snippet(hit), quote=False)}</blockquote></li>"
     )
-    
-    buffer = BytesIO()
-    result = pisa.CreatePDF(src=template, dest=buffer, encoding='utf-8')
+
+
+def _render_references(hits: Sequence[Mapping[str, Any]]) -> str:
+    return "<ol>" + "".join([_render_reference(hit) for hit in hits]) + "</ol>"
+
+
+def _render_html(query: str, answer: str, hits: Sequence[Mapping[str, Any]], rec: str) -> str:
+    # The report layout is fixed, so emit its HTML directly; only the free-text
+    # fields (answer, recommendation) may need markdown.
+    ts = _now_str()
+    parts = [
+        "<h1>Rekomendasi Kebijakan - Laporan</h1>",
+        f"<p><em>Generated: {ts}</em></p>",
+        "<h2>Pertanyaan</h2>",
+        f"<p>{escape(query, quote=False)}</p>",
+        "<h2>Jawaban/Analisis</h2>",
+        _render_text(answer),
+        "<h2>Referensi Konteks</h2>",
+    ]
+    if hits:
+        parts.append(_render_references(hits))
+    if rec:
+        parts.append("<h2>Rekomendasi Sistem</h2>")
+        parts.append(_render_text(rec))
+    return "".join(parts)
+
+
+def make_pdf_report_to(dest: BinaryIO, query: str, answer: str, hits: Sequence[Mapping[str, Any]], rec: str = "") -> None:
+    """Write the PDF report straight into ``dest`` (a response stream, temp file, ...)."""
+    from xhtml2pdf import pisa
+
+    html = _render_html(query, answer, hits, rec)
+    template = "".join((_HTML_PREFIX, html, _HTML_SUFFIX))
+    result = pisa.CreatePDF(src=template, dest=dest, encoding='utf-8')
     if result.err:
         raise RuntimeError("Gagal membuat PDF dari laporan markdown.")
-    buffer.seek(0)
-    return buffer.read()
+
+
+def make_pdf_report(query: str, answer: str, hits: Sequence[Mapping[str, Any]], rec: str = "") -> bytes:
+    buffer = BytesIO()
+    make_pdf_report_to(buffer, query, answer, hits, rec)
+    return buffer.getvalue()
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Callers (Streamlit, uvicorn) are multi-threaded; forking them can
+            # deadlock on locks held by other threads, so spawn fresh workers.
+            _pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _make_pdf_report_item(item: Mapping[str, Any]) -> bytes:
+    return make_pdf_report(**item)
+
+
+def make_pdf_reports(items: Sequence[Mapping[str, Any]]) -> list[bytes]:
+    """Render several reports at once; each item holds make_pdf_report's keyword arguments.
+
+    xhtml2pdf is pure Python and GIL bound, so batches fan out to worker processes.
+    """
+    if len(items) <= 1:
+        return [_make_pdf_report_item(item) for item in items]
+    return list(_process_pool().map(_make_pdf_report_item, items))